@@ -5,12 +5,14 @@ from django.utils.html import format_html
 from django.utils.http import url_has_allowed_host_and_scheme
 
 from .models import (
+    Banner,
     Product,
     ProductCategory,
     Restaurant,
     RestaurantMenuItem,
     Order,
     OrderItems,
+    OrderJob,
 )
 
 
@@ -33,6 +35,11 @@ class OrderAdmin(admin.ModelAdmin):
     ]
 
     inlines = [OrderItemsInline, ]
+    readonly_fields = ['total_price']
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        form.instance.update_total_price()
 
     def response_post_save_change(self, request, obj):
         response = super().response_post_save_change(request, obj)
@@ -45,6 +52,25 @@ class OrderAdmin(admin.ModelAdmin):
         return response
 
 
+@admin.register(OrderJob)
+class OrderJobAdmin(admin.ModelAdmin):
+    list_display = [
+        'order',
+        'kind',
+        'status',
+        'attempts',
+        'run_after',
+        'finished_at',
+    ]
+    list_filter = [
+        'status',
+        'kind',
+    ]
+    raw_id_fields = [
+        'order',
+    ]
+
+
 @admin.register(Restaurant)
 class RestaurantAdmin(admin.ModelAdmin):
     search_fields = [
@@ -136,6 +162,30 @@ class ProductAdmin(admin.ModelAdmin):
     get_image_list_preview.short_description = 'превью'
 
 
+@admin.register(Banner)
+class BannerAdmin(admin.ModelAdmin):
+    list_display = [
+        'get_image_list_preview',
+        'title',
+        'text',
+        'position',
+        'is_active',
+    ]
+    list_display_links = [
+        'title',
+    ]
+    list_editable = [
+        'position',
+        'is_active',
+    ]
+
+    def get_image_list_preview(self, obj):
+        if not obj.image:
+            return 'нет картинки'
+        return format_html('<img src="{src}" style="max-height: 50px;"/>', src=obj.image.url)
+    get_image_list_preview.short_description = 'превью'
+
+
 @admin.register(ProductCategory)
 class ProductAdmin(admin.ModelAdmin):
     pass
@@ -0,0 +1,65 @@
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+
+from locations.distance import get_distance_matrix
+from locations.geocoder import geocode_addresses
+
+from .models import Order, OrderCandidate, OrderEvent, Restaurant, RestaurantMenuItem
+
+
+CHUNK_SIZE = 500
+
+
+def update_orders_candidates(orders):
+    orders = list(orders.only('id', 'address'))
+    stale_order_ids = []
+    for start in range(0, len(orders), CHUNK_SIZE):
+        stale_order_ids += update_candidates_chunk(orders[start:start + CHUNK_SIZE])
+    return stale_order_ids
+
+
+def update_candidates_chunk(orders):
+    order_ids = [order.id for order in orders]
+    orders_restaurants = RestaurantMenuItem.objects.get_orders_restaurants(order_ids)
+    restaurants = Restaurant.objects.in_bulk(
+        set().union(*orders_restaurants.values())
+    )
+    restaurant_ids = list(restaurants)
+    restaurant_indexes = {restaurant_id: index for index, restaurant_id in enumerate(restaurant_ids)}
+
+    coordinates, unavailable_addresses = geocode_addresses(order.address for order in orders)
+    distances = get_distance_matrix(
+        [coordinates.get(order.address) for order in orders],
+        [restaurants[restaurant_id].coordinates for restaurant_id in restaurant_ids],
+    )
+
+    candidates = []
+    updated_order_ids = []
+    stale_order_ids = []
+    for order, order_distances in zip(orders, distances):
+        if order.address in unavailable_addresses:
+            stale_order_ids.append(order.id)
+        else:
+            updated_order_ids.append(order.id)
+        for restaurant_id in orders_restaurants.get(order.id, []):
+            distance = order_distances[restaurant_indexes[restaurant_id]]
+            candidates.append(OrderCandidate(
+                order=order,
+                restaurant_id=restaurant_id,
+                distance=None if np.isnan(distance) else float(distance),
+            ))
+
+    with transaction.atomic():
+        # Concurrent recomputations of the same orders would clash on the unique candidate rows
+        list(Order.objects.select_for_update().filter(id__in=order_ids).values_list('id', flat=True))
+        OrderCandidate.objects.filter(order__in=order_ids).delete()
+        OrderCandidate.objects.bulk_create(candidates)
+        # Orders stay stale while the geocoder is unavailable, so their job is retried later
+        Order.objects.filter(id__in=updated_order_ids).update(candidates_updated_at=timezone.now())
+        OrderEvent.objects.log(updated_order_ids)
+    return stale_order_ids
+
+
+def invalidate_products_candidates(product_ids):
+    Order.objects.filter(order_items__product__in=product_ids).invalidate_candidates()
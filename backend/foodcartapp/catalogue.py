@@ -0,0 +1,107 @@
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+from star_burger.caching import bump_version_on_commit, get_or_build, get_version_datetime, get_version_etag
+
+from .candidates import invalidate_products_candidates
+from .models import Banner, Product, Restaurant, RestaurantMenuItem
+
+
+CATALOGUE_VERSION = 'catalogue'
+BANNERS_VERSION = 'banners'
+MENU_VERSION = 'menu'
+PRODUCTS_VERSION = 'products'
+RESTAURANTS_VERSION = 'restaurants'
+
+
+def dump_json(data):
+    return json.dumps(
+        data,
+        cls=DjangoJSONEncoder,
+        ensure_ascii=False,
+        separators=(',', ':'),
+    ).encode()
+
+
+def serialize_products():
+    products = Product.objects.select_related('category').available()
+
+    dumped_products = []
+    for product in products:
+        dumped_product = {
+            'id': product.id,
+            'name': product.name,
+            'price': product.price,
+            'special_status': product.special_status,
+            'description': product.description,
+            'category': {
+                'id': product.category.id,
+                'name': product.category.name,
+            } if product.category else None,
+            'image': product.image.url,
+            'restaurant': {
+                'id': product.id,
+                'name': product.name,
+            }
+        }
+        dumped_products.append(dumped_product)
+    return dump_json(dumped_products)
+
+
+def get_catalogue_etag(request):
+    return get_version_etag(CATALOGUE_VERSION)
+
+
+def get_catalogue_last_modified(request):
+    return get_version_datetime(CATALOGUE_VERSION)
+
+
+def get_serialized_catalogue():
+    return get_or_build(CATALOGUE_VERSION, serialize_products)
+
+
+def serialize_banners():
+    banners = Banner.objects.filter(is_active=True)
+    return dump_json([
+        {
+            'title': banner.title,
+            'src': banner.image.url,
+            'text': banner.text,
+        }
+        for banner in banners
+    ])
+
+
+def get_banners_etag(request):
+    return get_version_etag(BANNERS_VERSION)
+
+
+def get_banners_last_modified(request):
+    return get_version_datetime(BANNERS_VERSION)
+
+
+def get_serialized_banners():
+    return get_or_build(BANNERS_VERSION, serialize_banners)
+
+
+def build_availability_matrix():
+    product_ids = list(Product.objects.order_by('pk').values_list('pk', flat=True))
+    restaurant_ids = list(Restaurant.objects.order_by('name', 'pk').values_list('pk', flat=True))
+    matrix = RestaurantMenuItem.objects.get_availability_matrix(product_ids, restaurant_ids)
+    return product_ids, restaurant_ids, matrix
+
+
+def get_availability_matrix():
+    return get_or_build(MENU_VERSION, build_availability_matrix)
+
+
+def set_menu_availability(product_ids, restaurant_ids, availability):
+    # Bulk queries bypass model signals, so caches are invalidated here once
+    with transaction.atomic():
+        changed_count = RestaurantMenuItem.objects.set_availability(product_ids, restaurant_ids, availability)
+        invalidate_products_candidates(product_ids)
+        bump_version_on_commit(CATALOGUE_VERSION)
+        bump_version_on_commit(MENU_VERSION)
+    return changed_count
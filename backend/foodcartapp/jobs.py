@@ -0,0 +1,83 @@
+import logging
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from locations.clients import GeocoderUnavailable
+
+from .candidates import update_orders_candidates
+from .models import Order, OrderJob
+
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 5
+RETRY_DELAY = timedelta(minutes=1)
+JOB_LEASE = timedelta(minutes=10)
+
+job_handlers = {}
+
+
+def job_handler(kind):
+    def register(handler):
+        job_handlers[kind] = handler
+        return handler
+    return register
+
+
+@job_handler('candidates')
+def find_order_candidates(order):
+    if update_orders_candidates(Order.objects.filter(pk=order.pk)):
+        raise GeocoderUnavailable(f'Не удалось определить координаты заказа #{order.id}')
+
+
+@job_handler('notify')
+def notify_managers(order):
+    logger.info('Новый заказ #%s: %s', order.id, order.address)
+
+
+def enqueue_order_jobs(orders):
+    OrderJob.objects.enqueue([order.id for order in orders], list(job_handlers))
+
+
+def run_job(job):
+    # Handlers manage their own transactions, so slow geocoder calls don't hold locks
+    try:
+        job_handlers[job.kind](job.order)
+    except Exception as error:
+        logger.exception('Задача %s завершилась ошибкой', job)
+        job.attempts += 1
+        job.last_error = repr(error)
+        if job.attempts >= MAX_ATTEMPTS:
+            job.status = 'failed'
+            job.finished_at = timezone.now()
+        else:
+            job.status = 'pending'
+            job.run_after = timezone.now() + RETRY_DELAY * 2 ** (job.attempts - 1)
+    else:
+        job.status = 'done'
+        job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'attempts', 'run_after', 'last_error', 'finished_at'])
+
+
+def claim_ready_jobs(batch_size):
+    with transaction.atomic():
+        jobs = list(
+            OrderJob.objects.ready(JOB_LEASE)
+            .select_related('order')
+            .select_for_update(skip_locked=True, of=('self',))
+            .order_by('run_after', 'id')[:batch_size]
+        )
+        OrderJob.objects.filter(id__in=[job.id for job in jobs]).update(
+            status='running',
+            locked_at=timezone.now(),
+        )
+    return jobs
+
+
+def run_ready_jobs(batch_size=20):
+    jobs = claim_ready_jobs(batch_size)
+    for job in jobs:
+        run_job(job)
+    return len(jobs)
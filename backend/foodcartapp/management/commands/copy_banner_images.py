@@ -0,0 +1,25 @@
+import os
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from foodcartapp.models import Banner
+
+
+class Command(BaseCommand):
+    help = 'Копирует картинки баннеров из каталога assets в хранилище медиафайлов'
+
+    def handle(self, *args, **options):
+        copied = 0
+        for banner in Banner.objects.exclude(image=''):
+            if default_storage.exists(banner.image.name):
+                continue
+            path = os.path.join(settings.BASE_DIR, 'assets', os.path.basename(banner.image.name))
+            if not os.path.exists(path):
+                continue
+            with open(path, 'rb') as image:
+                default_storage.save(banner.image.name, File(image))
+            copied += 1
+        self.stdout.write(f'Скопировано картинок: {copied}')
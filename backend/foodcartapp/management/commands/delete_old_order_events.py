@@ -0,0 +1,23 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from foodcartapp.models import OrderEvent
+
+
+class Command(BaseCommand):
+    help = 'Удаляет старые записи журнала изменений заказов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours',
+            type=int,
+            default=24,
+            help='сколько часов хранить журнал',
+        )
+
+    def handle(self, *args, **options):
+        created_before = timezone.now() - timedelta(hours=options['hours'])
+        deleted, _ = OrderEvent.objects.filter(created_at__lt=created_before).delete()
+        self.stdout.write(f'Удалено записей: {deleted}')
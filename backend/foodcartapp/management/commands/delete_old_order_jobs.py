@@ -0,0 +1,23 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from foodcartapp.models import OrderJob
+
+
+class Command(BaseCommand):
+    help = 'Удаляет выполненные и завершившиеся ошибкой фоновые задачи заказов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=7,
+            help='сколько дней хранить завершённые задачи',
+        )
+
+    def handle(self, *args, **options):
+        created_before = timezone.now() - timedelta(days=options['days'])
+        deleted, _ = OrderJob.objects.finished().filter(created_at__lt=created_before).delete()
+        self.stdout.write(f'Удалено задач: {deleted}')
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from foodcartapp.models import Order, Restaurant
+from locations.geocoder import get_coordinates
+
+
+class Command(BaseCommand):
+    help = 'Заполняет координаты ресторанов по их адресам'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='пересчитать координаты всех ресторанов, а не только незаполненные',
+        )
+
+    def handle(self, *args, **options):
+        restaurants = Restaurant.objects.exclude(address='')
+        if not options['all']:
+            restaurants = restaurants.filter(lat__isnull=True)
+        restaurants = list(restaurants)
+
+        coordinates = get_coordinates(restaurant.address for restaurant in restaurants)
+        for restaurant in restaurants:
+            restaurant.lat, restaurant.lon = coordinates.get(restaurant.address) or (None, None)
+        Restaurant.objects.bulk_update(restaurants, ['lat', 'lon'])
+
+        # bulk_update skips Restaurant.save, so distances to located restaurants are refreshed here
+        located_restaurants = [restaurant for restaurant in restaurants if restaurant.lat is not None]
+        Order.objects.filter(candidates__restaurant__in=located_restaurants).invalidate_candidates()
+        self.stdout.write(f'Обновлено ресторанов: {len(located_restaurants)} из {len(restaurants)}')
@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from foodcartapp.jobs import run_ready_jobs
+
+
+class Command(BaseCommand):
+    help = 'Выполняет фоновые задачи по новым заказам'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='выполнить накопившиеся задачи и завершиться',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=2,
+            help='пауза в секундах, когда очередь пуста',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=20,
+            help='сколько задач забирать за раз',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            processed = run_ready_jobs(options['batch_size'])
+            if processed:
+                self.stdout.write(f'Выполнено задач: {processed}')
+                continue
+            if options['once']:
+                return
+            time.sleep(options['sleep'])
@@ -0,0 +1,30 @@
+from django.db import migrations
+
+
+BANNERS = [
+    ('Burger', 'Tasty Burger at your door step', 'banners/burger.jpg'),
+    ('Spices', 'All Cuisines', 'banners/food.jpg'),
+    ('New York', 'Food is incomplete without a tasty dessert', 'banners/tasty.jpg'),
+]
+
+
+def create_banners(apps, schema_editor):
+    # Image files are copied to the media storage by the copy_banner_images command
+    Banner = apps.get_model('foodcartapp', 'Banner')
+    if Banner.objects.exists():
+        return
+    Banner.objects.bulk_create([
+        Banner(title=title, text=text, image=image, position=position)
+        for position, (title, text, image) in enumerate(BANNERS)
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0049_banner'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_banners, migrations.RunPython.noop),
+    ]
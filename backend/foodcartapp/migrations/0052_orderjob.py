@@ -0,0 +1,37 @@
+# Generated by Django 3.2.15 on 2026-10-18 18:51
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0051_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('geocode', 'Геокодирование адреса'), ('notify', 'Уведомление менеджеров')], max_length=20, verbose_name='задача')),
+                ('status', models.CharField(choices=[('pending', 'В очереди'), ('done', 'Выполнено'), ('failed', 'Ошибка')], default='pending', max_length=20, verbose_name='статус')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='попыток')),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now, verbose_name='запустить после')),
+                ('last_error', models.TextField(blank=True, verbose_name='последняя ошибка')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='время создания')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='время выполнения')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='jobs', to='foodcartapp.order', verbose_name='заказ')),
+            ],
+            options={
+                'verbose_name': 'фоновая задача заказа',
+                'verbose_name_plural': 'фоновые задачи заказов',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='orderjob',
+            index=models.Index(fields=['status', 'run_after'], name='foodcartapp_status_c9e9f4_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+from django.db import migrations, models
+from django.db.models import ExpressionWrapper, F, OuterRef, Subquery, Sum
+
+
+def fill_total_price(apps, schema_editor):
+    Order = apps.get_model('foodcartapp', 'Order')
+    OrderItems = apps.get_model('foodcartapp', 'OrderItems')
+    totals = (
+        OrderItems.objects
+        .filter(order=OuterRef('pk'))
+        .values('order')
+        .annotate(total_price=Sum(ExpressionWrapper(
+            F('price') * F('quantity'),
+            output_field=models.DecimalField(),
+        )))
+        .values('total_price')
+    )
+    Order.objects.filter(order_items__isnull=False).distinct().update(
+        total_price=Subquery(totals, output_field=models.DecimalField())
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0053_order_total_price'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_total_price, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 3.2.15 on 2026-10-18 18:53
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def rename_geocode_jobs(apps, schema_editor):
+    OrderJob = apps.get_model('foodcartapp', 'OrderJob')
+    OrderJob.objects.filter(kind='geocode').update(kind='candidates')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0054_populate_order_total_price'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='candidates_updated_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='время подбора ресторанов'),
+        ),
+        migrations.AlterField(
+            model_name='orderjob',
+            name='kind',
+            field=models.CharField(choices=[('candidates', 'Подбор ресторанов'), ('notify', 'Уведомление менеджеров')], max_length=20, verbose_name='задача'),
+        ),
+        migrations.CreateModel(
+            name='OrderCandidate',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('distance', models.FloatField(blank=True, null=True, verbose_name='расстояние, км')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='candidates', to='foodcartapp.order', verbose_name='заказ')),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='order_candidates', to='foodcartapp.restaurant', verbose_name='ресторан')),
+            ],
+            options={
+                'verbose_name': 'ресторан для заказа',
+                'verbose_name_plural': 'рестораны для заказов',
+                'unique_together': {('order', 'restaurant')},
+            },
+        ),
+        migrations.RunPython(rename_geocode_jobs, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 3.2.15 on 2026-10-18 18:55
+
+from django.db import migrations, models
+import django.utils.timezone
+import phonenumber_field.modelfields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0056_orderevent'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='order',
+            name='address',
+            field=models.TextField(max_length=200, verbose_name='адрес'),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='called_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Время звонка'),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='Время создания'),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='delivered_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Время доставки'),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='firstname',
+            field=models.CharField(max_length=50, verbose_name='имя'),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='lastname',
+            field=models.CharField(max_length=50, verbose_name='фамилия'),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='payment_method',
+            field=models.CharField(choices=[('unknown', 'Не указан'), ('cash', 'Наличные'), ('card', 'Карта')], default='Не указан', max_length=50, verbose_name='способ оплаты'),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='phonenumber',
+            field=phonenumber_field.modelfields.PhoneNumberField(max_length=128, region=None, verbose_name='телефон'),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='status',
+            field=models.CharField(choices=[('processing', 'В обработке'), ('packing', 'Готовится'), ('delivery', 'Передан в доставку'), ('done', 'Завершен')], default='В обработке', max_length=50, verbose_name='статус'),
+        ),
+        migrations.AlterField(
+            model_name='restaurantmenuitem',
+            name='availability',
+            field=models.BooleanField(default=True, verbose_name='в продаже'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('status', 'done'), _negated=True), fields=['created_at', 'id'], name='order_open_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', 'created_at', 'id'], name='order_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='restaurantmenuitem',
+            index=models.Index(condition=models.Q(('availability', True)), fields=['product', 'restaurant'], name='menu_available_product_idx'),
+        ),
+    ]
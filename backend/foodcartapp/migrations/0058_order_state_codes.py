@@ -0,0 +1,77 @@
+from django.db import migrations, models
+
+
+STATUS_CODES = {
+    1: ['processing', 'В обработке'],
+    2: ['packing', 'Готовится'],
+    3: ['delivery', 'Передан в доставку'],
+    4: ['done', 'Завершен'],
+}
+PAYMENT_METHOD_CODES = {
+    0: ['unknown', 'Не указан'],
+    1: ['cash', 'Наличные'],
+    2: ['card', 'Карта'],
+}
+
+
+def fill_state_codes(apps, schema_editor):
+    Order = apps.get_model('foodcartapp', 'Order')
+    for code, values in STATUS_CODES.items():
+        Order.objects.filter(status__in=values).update(status_code=code)
+    for code, values in PAYMENT_METHOD_CODES.items():
+        Order.objects.filter(payment_method__in=values).update(payment_method_code=code)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0057_query_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='order',
+            name='order_open_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='order',
+            name='order_status_created_idx',
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='status_code',
+            field=models.PositiveSmallIntegerField(choices=[(1, 'В обработке'), (2, 'Готовится'), (3, 'Передан в доставку'), (4, 'Завершен')], default=1, verbose_name='статус'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='payment_method_code',
+            field=models.PositiveSmallIntegerField(choices=[(0, 'Не указан'), (1, 'Наличные'), (2, 'Карта')], default=0, verbose_name='способ оплаты'),
+        ),
+        migrations.RunPython(fill_state_codes, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='order',
+            name='status',
+        ),
+        migrations.RemoveField(
+            model_name='order',
+            name='payment_method',
+        ),
+        migrations.RenameField(
+            model_name='order',
+            old_name='status_code',
+            new_name='status',
+        ),
+        migrations.RenameField(
+            model_name='order',
+            old_name='payment_method_code',
+            new_name='payment_method',
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('status', 4), _negated=True), fields=['created_at', 'id'], name='order_open_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', 'created_at', 'id'], name='order_status_created_idx'),
+        ),
+    ]
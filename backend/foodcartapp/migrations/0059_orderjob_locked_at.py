@@ -0,0 +1,23 @@
+# Generated by Django 3.2.15 on 2026-10-18 19:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0058_order_state_codes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderjob',
+            name='locked_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='время запуска'),
+        ),
+        migrations.AlterField(
+            model_name='orderjob',
+            name='status',
+            field=models.CharField(choices=[('pending', 'В очереди'), ('running', 'Выполняется'), ('done', 'Выполнено'), ('failed', 'Ошибка')], default='pending', max_length=20, verbose_name='статус'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+from django.db import migrations
+
+
+def enqueue_stale_candidates(apps, schema_editor):
+    Order = apps.get_model('foodcartapp', 'Order')
+    OrderJob = apps.get_model('foodcartapp', 'OrderJob')
+    stale_orders = (
+        Order.objects
+        .filter(candidates_updated_at__isnull=True)
+        .exclude(status=4)
+        .exclude(jobs__kind='candidates', jobs__status='pending')
+        .values_list('id', flat=True)
+    )
+    OrderJob.objects.bulk_create([
+        OrderJob(order_id=order_id, kind='candidates')
+        for order_id in stale_orders.iterator()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0059_orderjob_locked_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(enqueue_stale_candidates, migrations.RunPython.noop),
+    ]
@@ -1,15 +1,64 @@
+import hashlib
+import json
+from collections import defaultdict
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
-from django.db.models import Count, F, Sum
+from django.db.models import ExpressionWrapper, F, Sum
 from django.core.validators import MinValueValidator
 from django.utils import timezone
 from phonenumber_field.modelfields import PhoneNumberField
 
+from locations.geocoder import geocode_addresses
+
 
 class RestaurantMenuItemQueryset(models.QuerySet):
-    def get_restaurants(self, products):
-        return self.filter(product__id__in=products) \
-            .values('restaurant__name', 'restaurant__address')\
-            .annotate(count_items=(Count('product__id'))).filter(count_items=len(products))
+    def get_orders_restaurants(self, orders):
+        orders_products = defaultdict(set)
+        order_items = OrderItems.objects.filter(order__in=orders).values_list('order_id', 'product_id')
+        for order_id, product_id in order_items:
+            orders_products[order_id].add(product_id)
+
+        products_restaurants = defaultdict(set)
+        menu_items = self.filter(availability=True).values_list('product_id', 'restaurant_id')
+        for product_id, restaurant_id in menu_items:
+            products_restaurants[product_id].add(restaurant_id)
+
+        return {
+            order_id: set.intersection(
+                *(products_restaurants[product_id] for product_id in products)
+            )
+            for order_id, products in orders_products.items()
+        }
+
+    def get_availability_matrix(self, product_ids, restaurant_ids):
+        rows = {product_id: row for row, product_id in enumerate(product_ids)}
+        columns = {restaurant_id: column for column, restaurant_id in enumerate(restaurant_ids)}
+        matrix = np.zeros((len(rows), len(columns)), dtype=bool)
+
+        menu_items = self.filter(availability=True).values_list('product_id', 'restaurant_id')
+        for product_id, restaurant_id in menu_items:
+            if product_id in rows and restaurant_id in columns:
+                matrix[rows[product_id], columns[restaurant_id]] = True
+        return matrix
+
+    def set_availability(self, product_ids, restaurant_ids, availability):
+        menu_items = self.filter(product__in=product_ids, restaurant__in=restaurant_ids)
+        updated_count = menu_items.update(availability=availability)
+        if not availability:
+            return updated_count
+
+        existing_items = set(menu_items.values_list('product_id', 'restaurant_id'))
+        created_items = self.bulk_create([
+            RestaurantMenuItem(product_id=product_id, restaurant_id=restaurant_id, availability=True)
+            for product_id in product_ids
+            for restaurant_id in restaurant_ids
+            if (product_id, restaurant_id) not in existing_items
+        ])
+        return updated_count + len(created_items)
 
 
 class Restaurant(models.Model):
@@ -26,6 +75,20 @@ class Restaurant(models.Model):
         verbose_name='контактный телефон',
         db_index=True
     )
+    lat = models.DecimalField(
+        'широта',
+        max_digits=9,
+        decimal_places=6,
+        null=True,
+        blank=True,
+    )
+    lon = models.DecimalField(
+        'долгота',
+        max_digits=9,
+        decimal_places=6,
+        null=True,
+        blank=True,
+    )
 
     class Meta:
         verbose_name = 'ресторан'
@@ -34,12 +97,37 @@ class Restaurant(models.Model):
     def __str__(self):
         return self.name
 
-
-class OrderQueryset(models.QuerySet):
-    def get_order(self):
-        return self.annotate(
-            order_price=Sum(F('order_items__product__price') * F('order_items__quantity'))
-        )
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._geocoded_address = instance.__dict__.get('address')
+        return instance
+
+    def save(self, *args, **kwargs):
+        address_changed = self.address != getattr(self, '_geocoded_address', None)
+        geocoded = False
+        if address_changed:
+            geocoded = self.update_coordinates()
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'lat', 'lon'}
+        super().save(*args, **kwargs)
+        if geocoded:
+            # While the geocoder is unavailable the address stays ungeocoded, so the next save retries it
+            self._geocoded_address = self.address
+        if address_changed:
+            Order.objects.filter(candidates__restaurant=self).invalidate_candidates()
+
+    def update_coordinates(self):
+        coordinates, unavailable_addresses = geocode_addresses([self.address])
+        self.lat, self.lon = coordinates.get(self.address) or (None, None)
+        return self.address not in unavailable_addresses
+
+    @property
+    def coordinates(self):
+        if self.lat is None or self.lon is None:
+            return None
+        return float(self.lat), float(self.lon)
 
 
 class ProductQuerySet(models.QuerySet):
@@ -122,7 +210,6 @@ class RestaurantMenuItem(models.Model):
     availability = models.BooleanField(
         'в продаже',
         default=True,
-        db_index=True
     )
 
     objects = RestaurantMenuItemQueryset.as_manager()
@@ -133,76 +220,81 @@ class RestaurantMenuItem(models.Model):
         unique_together = [
             ['restaurant', 'product']
         ]
+        indexes = [
+            models.Index(
+                fields=['product', 'restaurant'],
+                condition=models.Q(availability=True),
+                name='menu_available_product_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.restaurant.name} - {self.product.name}"
 
 
+class OrderStatus(models.IntegerChoices):
+    PROCESSING = 1, 'В обработке'
+    PACKING = 2, 'Готовится'
+    DELIVERY = 3, 'Передан в доставку'
+    DONE = 4, 'Завершен'
+
+
+class PaymentMethod(models.IntegerChoices):
+    UNKNOWN = 0, 'Не указан'
+    CASH = 1, 'Наличные'
+    CARD = 2, 'Карта'
+
+
+class OrderQuerySet(models.QuerySet):
+    def invalidate_candidates(self):
+        order_ids = list(self.exclude(status=OrderStatus.DONE).values_list('id', flat=True).distinct())
+        Order.objects.filter(id__in=order_ids).update(candidates_updated_at=None)
+        OrderJob.objects.enqueue(order_ids, ['candidates'])
+
+
 class Order(models.Model):
-    ORDER_STATUS_CHOICES = [
-        ('processing', 'В обработке'),
-        ('packing', 'Готовится'),
-        ('delivery', 'Передан в доставку'),
-        ('done', 'Завершен'),
-    ]
-    PAYMENT_CHOICES = [
-        ('unknown', 'Не указан'),
-        ('cash', 'Наличные'),
-        ('card', 'Карта')
-    ]
     firstname = models.CharField(
         verbose_name='имя',
         max_length=50,
-        db_index=True,
     )
     lastname = models.CharField(
         verbose_name='фамилия',
         max_length=50,
-        db_index=True,
     )
     phonenumber = PhoneNumberField(
         verbose_name='телефон',
-        db_index=True,
     )
     address = models.TextField(
         verbose_name='адрес',
         max_length=200,
-        db_index=True,
     )
-    status = models.CharField(
+    status = models.PositiveSmallIntegerField(
         verbose_name='статус',
-        max_length=50,
-        choices=ORDER_STATUS_CHOICES,
-        default='В обработке',
-        db_index=True
+        choices=OrderStatus.choices,
+        default=OrderStatus.PROCESSING,
     )
     created_at = models.DateTimeField(
         verbose_name='Время создания',
         default=timezone.now,
-        db_index=True,
     )
     called_at = models.DateTimeField(
         verbose_name='Время звонка',
         blank=True,
         null=True,
-        db_index=True,
     )
     delivered_at = models.DateTimeField(
         verbose_name='Время доставки',
         blank=True,
         null=True,
-        db_index=True,
     )
     comment = models.TextField(
         verbose_name='комментарий',
         blank=True,
     )
-    payment_method = models.CharField(
+    payment_method = models.PositiveSmallIntegerField(
         'способ оплаты',
-        max_length=50,
-        choices=PAYMENT_CHOICES,
-        default='Не указан',
-        db_index=True
+        choices=PaymentMethod.choices,
+        default=PaymentMethod.UNKNOWN,
     )
     restaurant = models.ForeignKey(
         Restaurant,
@@ -212,15 +304,193 @@ class Order(models.Model):
         null=True,
         on_delete=models.CASCADE
     )
-    objects = OrderQueryset.as_manager()
+    total_price = models.DecimalField(
+        'сумма заказа',
+        max_digits=10,
+        decimal_places=2,
+        default=0,
+        validators=[MinValueValidator(0)]
+    )
+    candidates_updated_at = models.DateTimeField(
+        'время подбора ресторанов',
+        blank=True,
+        null=True,
+    )
+    updated_at = models.DateTimeField(
+        'время изменения',
+        default=timezone.now,
+    )
+
+    objects = OrderQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'заказ'
         verbose_name_plural = 'заказы'
+        indexes = [
+            models.Index(
+                fields=['created_at', 'id'],
+                condition=~models.Q(status=OrderStatus.DONE),
+                name='order_open_created_idx',
+            ),
+            models.Index(
+                fields=['status', 'created_at', 'id'],
+                name='order_status_created_idx',
+            ),
+        ]
 
     def __str__(self) -> str:
         return f'{self.firstname} {self.lastname} {self.address}'
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_address = instance.__dict__.get('address')
+        return instance
+
+    def save(self, *args, **kwargs):
+        address_changed = self.address != getattr(self, '_loaded_address', None)
+        super().save(*args, **kwargs)
+        self._loaded_address = self.address
+        if address_changed:
+            Order.objects.filter(pk=self.pk).invalidate_candidates()
+
+    def update_total_price(self):
+        total_price = self.order_items.aggregate(
+            total_price=Sum(ExpressionWrapper(
+                F('price') * F('quantity'),
+                output_field=models.DecimalField(),
+            ))
+        )['total_price']
+        self.total_price = total_price or 0
+        self.save(update_fields=['total_price'])
+
+
+class OrderCandidate(models.Model):
+    order = models.ForeignKey(
+        Order,
+        verbose_name='заказ',
+        related_name='candidates',
+        on_delete=models.CASCADE,
+    )
+    restaurant = models.ForeignKey(
+        Restaurant,
+        verbose_name='ресторан',
+        related_name='order_candidates',
+        on_delete=models.CASCADE,
+    )
+    distance = models.FloatField('расстояние, км', blank=True, null=True)
+
+    class Meta:
+        verbose_name = 'ресторан для заказа'
+        verbose_name_plural = 'рестораны для заказов'
+        unique_together = [
+            ['order', 'restaurant']
+        ]
+
+    def __str__(self):
+        return f'{self.order_id} - {self.restaurant_id}'
+
+
+class OrderEventQuerySet(models.QuerySet):
+    def log(self, order_ids):
+        order_ids = set(order_ids)
+        # Unlike the event log, updated_at is never purged, so it can key cached order rows
+        Order.objects.filter(id__in=order_ids).update(updated_at=timezone.now())
+        return self.bulk_create([OrderEvent(order_id=order_id) for order_id in order_ids])
+
+
+class OrderEvent(models.Model):
+    order = models.ForeignKey(
+        Order,
+        verbose_name='заказ',
+        related_name='events',
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+    )
+    created_at = models.DateTimeField(
+        'время изменения',
+        default=timezone.now,
+        db_index=True,
+    )
+
+    objects = OrderEventQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'изменение заказа'
+        verbose_name_plural = 'изменения заказов'
+
+    def __str__(self):
+        return f'{self.order_id} {self.created_at}'
+
+
+class OrderJobQuerySet(models.QuerySet):
+    def ready(self, lease):
+        now = timezone.now()
+        # Jobs of a crashed worker are picked up again once their lease expires
+        return self.filter(
+            models.Q(status='pending', run_after__lte=now)
+            | models.Q(status='running', locked_at__lt=now - lease)
+        )
+
+    def finished(self):
+        return self.filter(status__in=['done', 'failed'])
+
+    def enqueue(self, order_ids, kinds):
+        queued = set(
+            self.filter(order__in=order_ids, kind__in=kinds, status='pending')
+            .values_list('order_id', 'kind')
+        )
+        return self.bulk_create([
+            OrderJob(order_id=order_id, kind=kind)
+            for order_id in order_ids
+            for kind in kinds
+            if (order_id, kind) not in queued
+        ])
+
+
+class OrderJob(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'В очереди'),
+        ('running', 'Выполняется'),
+        ('done', 'Выполнено'),
+        ('failed', 'Ошибка'),
+    ]
+    KIND_CHOICES = [
+        ('candidates', 'Подбор ресторанов'),
+        ('notify', 'Уведомление менеджеров'),
+    ]
+    order = models.ForeignKey(
+        Order,
+        verbose_name='заказ',
+        related_name='jobs',
+        on_delete=models.CASCADE,
+    )
+    kind = models.CharField('задача', max_length=20, choices=KIND_CHOICES)
+    status = models.CharField(
+        'статус',
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default='pending',
+    )
+    attempts = models.PositiveSmallIntegerField('попыток', default=0)
+    run_after = models.DateTimeField('запустить после', default=timezone.now)
+    last_error = models.TextField('последняя ошибка', blank=True)
+    locked_at = models.DateTimeField('время запуска', blank=True, null=True)
+    created_at = models.DateTimeField('время создания', default=timezone.now)
+    finished_at = models.DateTimeField('время выполнения', blank=True, null=True)
+
+    objects = OrderJobQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'фоновая задача заказа'
+        verbose_name_plural = 'фоновые задачи заказов'
+        indexes = [
+            models.Index(fields=['status', 'run_after']),
+        ]
+
+    def __str__(self):
+        return f'{self.get_kind_display()} #{self.order_id}'
+
 
 class OrderItems(models.Model):
     order = models.ForeignKey(
@@ -252,3 +522,51 @@ class OrderItems(models.Model):
 
     def __str__(self):
         return f'{self.product.name}, {self.order.firstname}'
+
+
+class Banner(models.Model):
+    title = models.CharField('заголовок', max_length=50)
+    text = models.CharField('текст', max_length=200, blank=True)
+    image = models.ImageField('картинка', upload_to='banners')
+    position = models.PositiveIntegerField('порядок', default=0, db_index=True)
+    is_active = models.BooleanField('показывать', default=True, db_index=True)
+
+    class Meta:
+        verbose_name = 'баннер'
+        verbose_name_plural = 'баннеры'
+        ordering = ['position', 'id']
+
+    def __str__(self):
+        return self.title
+
+
+class IdempotencyKeyQuerySet(models.QuerySet):
+    def expired(self):
+        retention = timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL)
+        return self.filter(created_at__lt=timezone.now() - retention)
+
+
+class IdempotencyKey(models.Model):
+    key = models.CharField('ключ', max_length=255, unique=True)
+    fingerprint = models.CharField('отпечаток запроса', max_length=64)
+    response_status = models.PositiveSmallIntegerField('код ответа')
+    response_data = models.JSONField('ответ', encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(
+        'время запроса',
+        default=timezone.now,
+        db_index=True,
+    )
+
+    objects = IdempotencyKeyQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'ключ идемпотентности'
+        verbose_name_plural = 'ключи идемпотентности'
+
+    def __str__(self):
+        return self.key
+
+    @staticmethod
+    def make_fingerprint(data):
+        dumped_data = json.dumps(data, sort_keys=True, cls=DjangoJSONEncoder)
+        return hashlib.sha256(dumped_data.encode()).hexdigest()
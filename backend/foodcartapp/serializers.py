@@ -1,10 +1,12 @@
-from rest_framework.serializers import ModelSerializer
+from django.db import connection, transaction
+from rest_framework.serializers import IntegerField, ModelSerializer, ValidationError
 from phonenumber_field.serializerfields import PhoneNumberField
-from .models import Order, OrderItems, Product
+from .jobs import enqueue_order_jobs
+from .models import Order, OrderEvent, OrderItems, Product
 
 
 class OrderitemsSerializer(ModelSerializer):
-    product = Product()
+    product = IntegerField(min_value=1)
 
     class Meta:
         model = OrderItems
@@ -26,12 +28,61 @@ class OrderSerializer(ModelSerializer):
             'products'
         ]
 
+    def validate_products(self, products):
+        product_ids = {item['product'] for item in products}
+        found_products = self.context.get('products')
+        if found_products is None:
+            found_products = Product.objects.in_bulk(product_ids)
+        missing_ids = sorted(product_ids - found_products.keys())
+        if missing_ids:
+            raise ValidationError(
+                [f'Недопустимый первичный ключ "{product_id}" - объект не существует.' for product_id in missing_ids]
+            )
+        return [
+            {**item, 'product': found_products[item['product']]}
+            for item in products
+        ]
+
     def create(self, validated_data):
-        products_data = validated_data.pop('products')
-        order = Order.objects.create(**validated_data)
-        order_products = []
-        for product in products_data:
-            price = Product.objects.get(id=product['product'].id).price
-            order_products.append(OrderItems(order=order, price=price, **product))
-        OrderItems.objects.bulk_create(order_products)
-        return order
+        return create_orders([validated_data])[0]
+
+
+@transaction.atomic
+def create_orders(orders_data):
+    orders = []
+    orders_products = []
+    for order_data in orders_data:
+        order_data = dict(order_data)
+        products = order_data.pop('products')
+        total_price = sum(product['product'].price * product['quantity'] for product in products)
+        orders_products.append(products)
+        orders.append(Order(total_price=total_price, **order_data))
+
+    if connection.features.can_return_rows_from_bulk_insert:
+        Order.objects.bulk_create(orders)
+    else:
+        for order in orders:
+            order.save()
+
+    OrderItems.objects.bulk_create([
+        OrderItems(order=order, price=product['product'].price, **product)
+        for order, products in zip(orders, orders_products)
+        for product in products
+    ])
+    OrderEvent.objects.log(order.id for order in orders)
+    enqueue_order_jobs(orders)
+    return orders
+
+
+def get_batch_products(orders_data):
+    product_ids = set()
+    for order_data in orders_data:
+        products = order_data.get('products') if isinstance(order_data, dict) else None
+        if not isinstance(products, list):
+            continue
+        for item in products:
+            try:
+                product_ids.add(int(item['product']))
+            except (TypeError, KeyError, ValueError):
+                continue
+    return Product.objects.in_bulk(product_ids)
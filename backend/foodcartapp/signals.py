@@ -0,0 +1,87 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from star_burger.caching import bump_version_on_commit
+
+from .candidates import invalidate_products_candidates
+from .catalogue import (
+    BANNERS_VERSION,
+    CATALOGUE_VERSION,
+    MENU_VERSION,
+    PRODUCTS_VERSION,
+    RESTAURANTS_VERSION,
+)
+from .models import (
+    Banner,
+    Order,
+    OrderEvent,
+    OrderItems,
+    Product,
+    ProductCategory,
+    Restaurant,
+    RestaurantMenuItem,
+)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=ProductCategory)
+@receiver(post_delete, sender=ProductCategory)
+@receiver(post_save, sender=RestaurantMenuItem)
+@receiver(post_delete, sender=RestaurantMenuItem)
+def invalidate_catalogue(sender, **kwargs):
+    bump_version_on_commit(CATALOGUE_VERSION)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Restaurant)
+@receiver(post_delete, sender=Restaurant)
+@receiver(post_save, sender=RestaurantMenuItem)
+@receiver(post_delete, sender=RestaurantMenuItem)
+def invalidate_menu(sender, **kwargs):
+    bump_version_on_commit(MENU_VERSION)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=ProductCategory)
+@receiver(post_delete, sender=ProductCategory)
+def invalidate_products(sender, **kwargs):
+    bump_version_on_commit(PRODUCTS_VERSION)
+
+
+@receiver(post_save, sender=Restaurant)
+@receiver(post_delete, sender=Restaurant)
+def invalidate_restaurants(sender, **kwargs):
+    bump_version_on_commit(RESTAURANTS_VERSION)
+
+
+@receiver(post_save, sender=Banner)
+@receiver(post_delete, sender=Banner)
+def invalidate_banners(sender, **kwargs):
+    bump_version_on_commit(BANNERS_VERSION)
+
+
+@receiver(post_save, sender=RestaurantMenuItem)
+@receiver(post_delete, sender=RestaurantMenuItem)
+def invalidate_menu_item_candidates(sender, instance, **kwargs):
+    invalidate_products_candidates([instance.product_id])
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+def log_order_change(sender, instance, **kwargs):
+    OrderEvent.objects.log([instance.id])
+
+
+@receiver(post_save, sender=OrderItems)
+@receiver(post_delete, sender=OrderItems)
+def log_order_items_change(sender, instance, **kwargs):
+    OrderEvent.objects.log([instance.order_id])
+    # Deferred until commit, so items removed together with their order don't queue a job for it
+    transaction.on_commit(
+        lambda: Order.objects.filter(pk=instance.order_id).invalidate_candidates()
+    )
+
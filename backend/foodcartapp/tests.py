@@ -0,0 +1,391 @@
+import io
+import uuid
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from locations.clients import GeocoderUnavailable
+from star_burger.caching import get_version
+
+from .catalogue import CATALOGUE_VERSION, set_menu_availability
+from .jobs import JOB_LEASE, run_ready_jobs
+from .models import (
+    Order,
+    OrderCandidate,
+    OrderEvent,
+    OrderItems,
+    OrderJob,
+    OrderStatus,
+    Product,
+    Restaurant,
+    RestaurantMenuItem,
+)
+from .views import MAX_ORDERS_BATCH_SIZE
+
+
+def create_order(**overrides):
+    return Order.objects.create(**{
+        'firstname': 'Иван',
+        'lastname': 'Петров',
+        'phonenumber': '+79001234567',
+        'address': 'Москва',
+        **overrides,
+    })
+
+
+def make_order_payload(products, quantity=1, **overrides):
+    return {
+        'firstname': 'Иван',
+        'lastname': 'Петров',
+        'phonenumber': '+79001234567',
+        'address': 'Москва, Красная площадь, 1',
+        'products': [{'product': product.id, 'quantity': quantity} for product in products],
+        **overrides,
+    }
+
+
+class RegisterOrderTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = [
+            Product.objects.create(name=f'Бургер {number}', price=100 + number, image='burger.jpg')
+            for number in range(20)
+        ]
+
+    def post_order(self, products):
+        return self.client.post('/api/order/', make_order_payload(products, quantity=2), content_type='application/json')
+
+    def test_query_count_does_not_depend_on_cart_size(self):
+        query_counts = []
+        for cart_size in [1, 5, 20]:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.post_order(self.products[:cart_size])
+            self.assertEqual(response.status_code, 200)
+            query_counts.append(len(queries))
+
+        self.assertEqual(len(set(query_counts)), 1, query_counts)
+        product_queries = [
+            query for query in queries.captured_queries
+            if query['sql'].startswith('SELECT') and '"foodcartapp_product"' in query['sql']
+        ]
+        self.assertEqual(len(product_queries), 1)
+
+    def test_prices_are_snapshotted(self):
+        self.post_order(self.products[:3])
+        order = Order.objects.get()
+        prices = OrderItems.objects.filter(order=order).values_list('product__price', 'price')
+        for product_price, price in prices:
+            self.assertEqual(product_price, price)
+
+    def test_total_price_is_stored(self):
+        self.post_order(self.products[:3])
+        order = Order.objects.get()
+        self.assertEqual(order.total_price, sum(product.price * 2 for product in self.products[:3]))
+
+    def test_failed_items_insert_leaves_no_order(self):
+        with mock.patch.object(OrderItems.objects, 'bulk_create', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                self.post_order(self.products[:1])
+
+        self.assertFalse(Order.objects.exists())
+        self.assertFalse(OrderEvent.objects.exists())
+
+    def test_unknown_product_is_rejected(self):
+        payload = make_order_payload([])
+        payload['products'] = [{'product': 100500, 'quantity': 1}]
+        response = self.client.post('/api/order/', payload, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('products', response.json())
+        self.assertFalse(Order.objects.exists())
+
+
+class IdempotencyKeyTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = Product.objects.create(name='Бургер', price=100, image='burger.jpg')
+
+    def post_order(self, key, quantity=1):
+        return self.client.post(
+            '/api/order/',
+            make_order_payload([self.product], quantity=quantity),
+            content_type='application/json',
+            HTTP_IDEMPOTENCY_KEY=key,
+        )
+
+    def test_repeated_key_returns_stored_response(self):
+        first_response = self.post_order('retry-me')
+        second_response = self.post_order('retry-me')
+
+        self.assertEqual(second_response.status_code, 200)
+        self.assertEqual(second_response.json(), first_response.json())
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_reused_key_with_other_payload_is_rejected(self):
+        self.post_order('retry-me')
+        response = self.post_order('retry-me', quantity=5)
+
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_too_long_key_is_rejected(self):
+        response = self.post_order('k' * 256)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Order.objects.count(), 0)
+
+
+class QueryPlanTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        restaurant = Restaurant.objects.create(name='Star Burger', contact_phone='+79001234567')
+        product = Product.objects.create(name='Бургер', price=100, image='burger.jpg')
+        RestaurantMenuItem.objects.create(restaurant=restaurant, product=product)
+        create_order(status=OrderStatus.PROCESSING)
+
+    def setUp(self):
+        if connection.vendor == 'postgresql':
+            # tiny test tables would be seq-scanned anyway, so make the planner show which index it can use
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(index_name, plan)
+
+    def test_open_orders_page_uses_partial_index(self):
+        orders = Order.objects.exclude(status=OrderStatus.DONE).order_by('created_at', 'id')[:50]
+        self.assertUsesIndex(orders, 'order_open_created_idx')
+
+    def test_orders_by_status_use_composite_index(self):
+        orders = Order.objects.filter(status=OrderStatus.PACKING).order_by('created_at', 'id')[:50]
+        self.assertUsesIndex(orders, 'order_status_created_idx')
+
+    def test_available_menu_uses_partial_index(self):
+        menu_items = RestaurantMenuItem.objects.filter(availability=True).values_list('product_id', 'restaurant_id')
+        self.assertUsesIndex(menu_items, 'menu_available_product_idx')
+
+    def test_available_products_use_partial_index(self):
+        self.assertUsesIndex(Product.objects.available(), 'menu_available_product_idx')
+
+
+class MenuAvailabilityTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.restaurants = [
+            Restaurant.objects.create(name=f'Star Burger {number}', contact_phone='+79001234567')
+            for number in range(3)
+        ]
+        cls.products = [
+            Product.objects.create(name=f'Бургер {number}', price=100, image='burger.jpg')
+            for number in range(3)
+        ]
+        RestaurantMenuItem.objects.create(restaurant=cls.restaurants[0], product=cls.products[0])
+
+    def get_available_items(self):
+        return set(
+            RestaurantMenuItem.objects
+            .filter(availability=True)
+            .values_list('product_id', 'restaurant_id')
+        )
+
+    def test_missing_menu_items_are_created(self):
+        product_ids = [product.id for product in self.products[:2]]
+        restaurant_ids = [restaurant.id for restaurant in self.restaurants]
+        with CaptureQueriesContext(connection) as queries:
+            changed_count = set_menu_availability(product_ids, restaurant_ids, True)
+
+        self.assertEqual(changed_count, 6)
+        self.assertEqual(
+            self.get_available_items(),
+            {(product_id, restaurant_id) for product_id in product_ids for restaurant_id in restaurant_ids},
+        )
+        menu_updates = [
+            query for query in queries.captured_queries
+            if query['sql'].startswith('UPDATE "foodcartapp_restaurantmenuitem"')
+        ]
+        self.assertEqual(len(menu_updates), 1)
+
+    def test_restaurant_stops_selling_products(self):
+        set_menu_availability([self.products[0].id], [self.restaurants[0].id], False)
+        self.assertEqual(self.get_available_items(), set())
+        self.assertEqual(RestaurantMenuItem.objects.count(), 1)
+
+
+class CatalogueVersionTest(TestCase):
+    def test_version_is_bumped_after_commit(self):
+        version = get_version(CATALOGUE_VERSION)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            Product.objects.create(name='Бургер', price=100, image='burger.jpg')
+            self.assertEqual(get_version(CATALOGUE_VERSION), version)
+
+        self.assertTrue(callbacks)
+        self.assertNotEqual(get_version(CATALOGUE_VERSION), version)
+
+
+class OrderJobTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.order = create_order()
+        OrderJob.objects.all().delete()
+
+    def test_jobs_are_claimed_and_finished(self):
+        job = OrderJob.objects.create(order=self.order, kind='notify')
+
+        self.assertEqual(run_ready_jobs(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'done')
+        self.assertIsNotNone(job.locked_at)
+        self.assertEqual(run_ready_jobs(), 0)
+
+    def test_job_with_expired_lease_is_claimed_again(self):
+        OrderJob.objects.create(order=self.order, kind='notify', status='running', locked_at=timezone.now())
+        OrderJob.objects.create(
+            order=self.order,
+            kind='notify',
+            status='running',
+            locked_at=timezone.now() - JOB_LEASE * 2,
+        )
+
+        self.assertEqual(run_ready_jobs(), 1)
+
+
+class OrderCandidatesTest(TestCase):
+    def setUp(self):
+        # Geocoding results are cached outside the test database, so every test uses its own address
+        self.order = create_order(address=f'Москва, улица Тестовая, {uuid.uuid4()}')
+
+    def run_candidates_job(self, fetch_coordinates):
+        client = mock.Mock(fetch_coordinates=fetch_coordinates)
+        with mock.patch('locations.geocoder.get_geocoder_client', return_value=client):
+            run_ready_jobs()
+        self.order.refresh_from_db()
+        return OrderJob.objects.get(order=self.order, kind='candidates')
+
+    def test_not_found_address_is_final(self):
+        job = self.run_candidates_job(mock.Mock(return_value=None))
+
+        self.assertEqual(job.status, 'done')
+        self.assertIsNotNone(self.order.candidates_updated_at)
+
+    def test_unavailable_geocoder_leaves_order_stale(self):
+        job = self.run_candidates_job(mock.Mock(side_effect=GeocoderUnavailable))
+
+        self.assertEqual(job.status, 'pending')
+        self.assertEqual(job.attempts, 1)
+        self.assertIsNone(self.order.candidates_updated_at)
+
+    def assertCandidatesQueued(self):
+        self.order.refresh_from_db()
+        self.assertIsNone(self.order.candidates_updated_at)
+        self.assertTrue(OrderJob.objects.filter(order=self.order, kind='candidates', status='pending').exists())
+
+    def test_address_change_queues_candidates_job(self):
+        self.run_candidates_job(mock.Mock(return_value=None))
+
+        self.order.address = f'Санкт-Петербург, {uuid.uuid4()}'
+        self.order.save()
+
+        self.assertCandidatesQueued()
+
+    def test_items_change_queues_candidates_job(self):
+        self.run_candidates_job(mock.Mock(return_value=None))
+        product = Product.objects.create(name='Бургер', price=100, image='burger.jpg')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            OrderItems.objects.create(order=self.order, product=product, quantity=1, price=100)
+
+        self.assertCandidatesQueued()
+
+
+class RegisterOrdersBatchTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = [
+            Product.objects.create(name=f'Бургер {number}', price=100 + number, image='burger.jpg')
+            for number in range(5)
+        ]
+
+    def post_batch(self, orders_data):
+        return self.client.post('/api/orders/batch/', orders_data, content_type='application/json')
+
+    def test_valid_and_invalid_orders_are_reported_separately(self):
+        invalid_order = make_order_payload(self.products[:1])
+        invalid_order['products'][0]['product'] = 0
+        response = self.post_batch([
+            make_order_payload(self.products[:2]),
+            invalid_order,
+            'не заказ',
+            make_order_payload(self.products[2:]),
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [result['status'] for result in response.json()],
+            ['created', 'invalid', 'invalid', 'created'],
+        )
+        self.assertEqual(Order.objects.count(), 2)
+        self.assertEqual(OrderItems.objects.count(), 5)
+
+    def test_products_are_fetched_once_for_the_batch(self):
+        orders_data = [make_order_payload(self.products[:number + 1]) for number in range(5)]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post_batch(orders_data)
+
+        self.assertEqual(response.status_code, 200)
+        product_queries = [
+            query for query in queries.captured_queries
+            if query['sql'].startswith('SELECT') and '"foodcartapp_product"' in query['sql']
+        ]
+        self.assertEqual(len(product_queries), 1)
+
+    def test_batch_size_is_limited(self):
+        response = self.post_batch([make_order_payload(self.products[:1])] * (MAX_ORDERS_BATCH_SIZE + 1))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Order.objects.count(), 0)
+
+    def test_non_list_body_is_rejected(self):
+        response = self.post_batch(make_order_payload(self.products[:1]))
+
+        self.assertEqual(response.status_code, 400)
+
+
+class RestaurantCoordinatesTest(TestCase):
+    def save_restaurant(self, restaurant, fetch_coordinates):
+        client = mock.Mock(fetch_coordinates=fetch_coordinates)
+        with mock.patch('locations.geocoder.get_geocoder_client', return_value=client):
+            restaurant.save()
+        return client
+
+    def test_address_is_geocoded_again_after_geocoder_outage(self):
+        restaurant = Restaurant(name='Star Burger', address=f'Москва, {uuid.uuid4()}')
+        self.save_restaurant(restaurant, mock.Mock(side_effect=GeocoderUnavailable))
+        self.assertIsNone(restaurant.lat)
+
+        self.save_restaurant(restaurant, mock.Mock(return_value=('37.6', '55.7')))
+        restaurant.refresh_from_db()
+        self.assertEqual((float(restaurant.lat), float(restaurant.lon)), (55.7, 37.6))
+
+    def test_geocoded_address_is_not_fetched_again(self):
+        restaurant = Restaurant(name='Star Burger', address=f'Москва, {uuid.uuid4()}')
+        self.save_restaurant(restaurant, mock.Mock(return_value=None))
+
+        client = self.save_restaurant(restaurant, mock.Mock(return_value=None))
+        client.fetch_coordinates.assert_not_called()
+
+    def test_backfill_invalidates_candidates(self):
+        restaurant = Restaurant(name='Star Burger', address=f'Москва, {uuid.uuid4()}')
+        self.save_restaurant(restaurant, mock.Mock(side_effect=GeocoderUnavailable))
+        order = create_order(candidates_updated_at=timezone.now())
+        OrderCandidate.objects.create(order=order, restaurant=restaurant)
+        OrderJob.objects.all().delete()
+
+        client = mock.Mock(fetch_coordinates=mock.Mock(return_value=('37.6', '55.7')))
+        with mock.patch('locations.geocoder.get_geocoder_client', return_value=client):
+            call_command('fill_restaurants_coordinates', stdout=io.StringIO())
+
+        self.assertTrue(OrderJob.objects.filter(order=order, kind='candidates').exists())
@@ -1,70 +1,102 @@
-from django.db import transaction
-from django.http import JsonResponse
-from django.templatetags.static import static
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 
 
-from .models import Product
-from .serializers import OrderSerializer
+from .catalogue import (
+    get_banners_etag,
+    get_banners_last_modified,
+    get_catalogue_etag,
+    get_catalogue_last_modified,
+    get_serialized_banners,
+    get_serialized_catalogue,
+)
+from .models import IdempotencyKey
+from .serializers import OrderSerializer, create_orders, get_batch_products
 
 
+MAX_ORDERS_BATCH_SIZE = 500
+
+
+@cache_control(no_cache=True)
+@condition(etag_func=get_banners_etag, last_modified_func=get_banners_last_modified)
 def banners_list_api(request):
-    # FIXME move data to db?
-    return JsonResponse([
-        {
-            'title': 'Burger',
-            'src': static('burger.jpg'),
-            'text': 'Tasty Burger at your door step',
-        },
-        {
-            'title': 'Spices',
-            'src': static('food.jpg'),
-            'text': 'All Cuisines',
-        },
-        {
-            'title': 'New York',
-            'src': static('tasty.jpg'),
-            'text': 'Food is incomplete without a tasty dessert',
-        }
-    ], safe=False, json_dumps_params={
-        'ensure_ascii': False,
-        'indent': 4,
-    })
+    return HttpResponse(get_serialized_banners(), content_type='application/json')
 
 
+@cache_control(no_cache=True)
+@condition(etag_func=get_catalogue_etag, last_modified_func=get_catalogue_last_modified)
 def product_list_api(request):
-    products = Product.objects.select_related('category').available()
-
-    dumped_products = []
-    for product in products:
-        dumped_product = {
-            'id': product.id,
-            'name': product.name,
-            'price': product.price,
-            'special_status': product.special_status,
-            'description': product.description,
-            'category': {
-                'id': product.category.id,
-                'name': product.category.name,
-            } if product.category else None,
-            'image': product.image.url,
-            'restaurant': {
-                'id': product.id,
-                'name': product.name,
-            }
-        }
-        dumped_products.append(dumped_product)
-    return JsonResponse(dumped_products, safe=False, json_dumps_params={
-        'ensure_ascii': False,
-        'indent': 4,
-    })
+    return HttpResponse(get_serialized_catalogue(), content_type='application/json')
 
 
-@transaction.atomic
 @api_view(['POST'])
 def register_order(request):
+    idempotency_key = request.headers.get('Idempotency-Key')
+    if idempotency_key:
+        if len(idempotency_key) > IdempotencyKey._meta.get_field('key').max_length:
+            return Response({'detail': 'Слишком длинный ключ идемпотентности.'}, status=400)
+        fingerprint = IdempotencyKey.make_fingerprint(request.data)
+        IdempotencyKey.objects.expired().filter(key=idempotency_key).delete()
+        stored_request = IdempotencyKey.objects.filter(key=idempotency_key).first()
+        if stored_request and stored_request.fingerprint != fingerprint:
+            return Response(
+                {'detail': 'Ключ идемпотентности уже использован для другого запроса.'},
+                status=422,
+            )
+        if stored_request:
+            return Response(stored_request.response_data, status=stored_request.response_status)
+
     serializer = OrderSerializer(data=request.data)
     serializer.is_valid(raise_exception=True)
-    serializer.create(serializer.validated_data)
+    with transaction.atomic():
+        serializer.save()
+        if idempotency_key:
+            try:
+                with transaction.atomic():
+                    IdempotencyKey.objects.create(
+                        key=idempotency_key,
+                        fingerprint=fingerprint,
+                        response_status=200,
+                        response_data=serializer.data,
+                    )
+            except IntegrityError:
+                transaction.set_rollback(True)
+                return Response(
+                    {'detail': 'Запрос с этим ключом идемпотентности уже обрабатывается.'},
+                    status=409,
+                )
     return Response(serializer.data)
+
+
+@transaction.atomic
+@api_view(['POST'])
+def register_orders_batch(request):
+    orders_data = request.data
+    if not isinstance(orders_data, list):
+        return Response({'detail': 'Ожидается список заказов.'}, status=400)
+    if len(orders_data) > MAX_ORDERS_BATCH_SIZE:
+        return Response(
+            {'detail': f'Не больше {MAX_ORDERS_BATCH_SIZE} заказов за один запрос.'},
+            status=400,
+        )
+
+    context = {'products': get_batch_products(orders_data)}
+    results = []
+    valid_orders = []
+    for order_data in orders_data:
+        serializer = OrderSerializer(data=order_data, context=context)
+        if serializer.is_valid():
+            result = {'status': 'created'}
+            valid_orders.append((result, serializer.validated_data))
+        else:
+            result = {'status': 'invalid', 'errors': serializer.errors}
+        results.append(result)
+
+    orders = create_orders(validated_data for _, validated_data in valid_orders)
+    for (result, _), order in zip(valid_orders, orders):
+        result['order'] = OrderSerializer(order).data
+    return Response(results)
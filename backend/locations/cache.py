@@ -0,0 +1,109 @@
+import time
+from collections import OrderedDict
+from threading import Lock
+
+from django.conf import settings
+from django.core.cache import cache
+
+from star_burger.caching import make_hashed_key
+
+
+class LRUCache:
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key, default=None):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return default
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self.entries[key]
+                return default
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        with self.lock:
+            self.entries[key] = (value, time.monotonic() + ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class GeocodeCache:
+    # Negative results are stored as an empty tuple so they can be told apart from cache misses
+    NOT_FOUND = ()
+
+    def __init__(self):
+        self.local = LRUCache(
+            settings.GEOCODE_LOCAL_CACHE_SIZE,
+            settings.GEOCODE_LOCAL_CACHE_TTL,
+        )
+        self.local_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_shared_key(address):
+        return make_hashed_key('geocode', address)
+
+    def get_many(self, addresses):
+        found = {}
+        for address in addresses:
+            coordinates = self.local.get(address)
+            if coordinates is not None:
+                found[address] = coordinates or None
+        self.local_hits += len(found)
+
+        shared_keys = {
+            self.make_shared_key(address): address
+            for address in addresses if address not in found
+        }
+        shared_found = cache.get_many(shared_keys) if shared_keys else {}
+        for shared_key, coordinates in shared_found.items():
+            address = shared_keys[shared_key]
+            self.local.set(address, coordinates)
+            found[address] = coordinates or None
+        self.shared_hits += len(shared_found)
+        self.misses += len(shared_keys) - len(shared_found)
+        return found
+
+    def set(self, address, coordinates, ttl):
+        if ttl <= 0:
+            return
+        coordinates = coordinates or self.NOT_FOUND
+        self.local.set(address, coordinates, ttl)
+        cache.set(self.make_shared_key(address), coordinates, ttl)
+
+    def delete(self, address):
+        self.local.delete(address)
+        cache.delete(self.make_shared_key(address))
+
+    def get_stats(self):
+        return {
+            'local_hits': self.local_hits,
+            'shared_hits': self.shared_hits,
+            'misses': self.misses,
+            'local_size': len(self.local),
+            'local_maxsize': self.local.maxsize,
+        }
+
+
+geocode_cache = GeocodeCache()
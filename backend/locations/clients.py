@@ -0,0 +1,129 @@
+import hashlib
+import logging
+import time
+from functools import lru_cache
+from threading import Lock
+
+import requests
+from django.conf import settings
+from django.utils.module_loading import import_string
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+logger = logging.getLogger(__name__)
+
+
+class GeopositionError(TypeError):
+    def __init__(self, text):
+        self.txt = text
+
+
+class GeocoderUnavailable(Exception):
+    pass
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.lock = Lock()
+
+    def is_open(self):
+        with self.lock:
+            if self.opened_at is None:
+                return False
+            if time.monotonic() - self.opened_at >= self.reset_timeout:
+                # half-open: let the next call through to probe the upstream
+                self.opened_at = None
+                self.failures = self.failure_threshold - 1
+                return False
+            return True
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+class YandexGeocoderClient:
+    base_url = 'https://geocode-maps.yandex.ru/1.x'
+
+    def __init__(self, apikey=None):
+        self.apikey = apikey or settings.YANDEX_API_KEY
+        self.timeout = settings.GEOCODER_TIMEOUT
+        self.breaker = CircuitBreaker(
+            settings.GEOCODER_FAILURE_THRESHOLD,
+            settings.GEOCODER_RESET_TIMEOUT,
+        )
+
+        retry = Retry(
+            total=settings.GEOCODER_RETRIES,
+            backoff_factor=settings.GEOCODER_BACKOFF,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=['GET'],
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=settings.GEOCODER_MAX_WORKERS,
+            max_retries=retry,
+        )
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+
+    def request_coordinates(self, address):
+        response = self.session.get(self.base_url, params={
+            'geocode': address,
+            'apikey': self.apikey,
+            'format': 'json',
+        }, timeout=self.timeout)
+        response.raise_for_status()
+        found_places = response.json()['response']['GeoObjectCollection']['featureMember']
+
+        if not found_places:
+            raise GeopositionError('Uncorrect address')
+
+        most_relevant = found_places[0]
+        lon, lat = most_relevant['GeoObject']['Point']['pos'].split(' ')
+        return lon, lat
+
+    def fetch_coordinates(self, address):
+        if self.breaker.is_open():
+            raise GeocoderUnavailable('Geocoder circuit breaker is open')
+        try:
+            coordinates = self.request_coordinates(address)
+        except GeopositionError:
+            self.breaker.record_success()
+            return None
+        except (requests.RequestException, KeyError, ValueError) as error:
+            self.breaker.record_failure()
+            logger.warning('Geocoder request for %r failed: %s', address, error)
+            raise GeocoderUnavailable(str(error)) from error
+        self.breaker.record_success()
+        return coordinates
+
+
+class FakeGeocoderClient:
+    def __init__(self, delay=None):
+        self.delay = settings.GEOCODER_FAKE_DELAY if delay is None else delay
+
+    def fetch_coordinates(self, address):
+        if self.delay:
+            time.sleep(self.delay)
+        digest = hashlib.sha256(address.encode()).digest()
+        lon = 37.35 + digest[0] / 255 * 0.5
+        lat = 55.55 + digest[1] / 255 * 0.35
+        return f'{lon:.6f}', f'{lat:.6f}'
+
+
+@lru_cache(maxsize=None)
+def get_geocoder_client():
+    return import_string(settings.GEOCODER_CLIENT)()
@@ -0,0 +1,26 @@
+import numpy as np
+
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def to_radians_array(coordinates):
+    points = [point if point else (np.nan, np.nan) for point in coordinates]
+    return np.radians(np.array(points, dtype=float).reshape(-1, 2))
+
+
+def get_distance_matrix(origins, destinations):
+    origins = to_radians_array(origins)
+    destinations = to_radians_array(destinations)
+
+    origin_lats = origins[:, 0, np.newaxis]
+    origin_lons = origins[:, 1, np.newaxis]
+    destination_lats = destinations[np.newaxis, :, 0]
+    destination_lons = destinations[np.newaxis, :, 1]
+
+    haversine = (
+        np.sin((destination_lats - origin_lats) / 2) ** 2
+        + np.cos(origin_lats) * np.cos(destination_lats)
+        * np.sin((destination_lons - origin_lons) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(haversine, 0, 1)))
@@ -0,0 +1,83 @@
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.utils import timezone
+
+from .cache import geocode_cache
+from .clients import GeocoderUnavailable, get_geocoder_client
+from .models import Location
+
+
+def normalize_address(address):
+    address = address.lower().replace('ё', 'е')
+    address = re.sub(r'[^\w\s]', ' ', address)
+    return ' '.join(address.split())
+
+
+def get_ttl(location, now):
+    return int((location.expires_at - now).total_seconds())
+
+
+def fetch_coordinates(client, address):
+    try:
+        return True, client.fetch_coordinates(address)
+    except GeocoderUnavailable:
+        return False, None
+
+
+def geocode_addresses(addresses):
+    addresses = [address for address in addresses if address]
+    queries = {}
+    for address in addresses:
+        queries.setdefault(normalize_address(address), address)
+
+    coordinates = geocode_cache.get_many(queries.keys())
+
+    now = timezone.now()
+    uncached_keys = [key for key in queries if key not in coordinates]
+    locations = Location.objects.in_bulk(uncached_keys, field_name='address') if uncached_keys else {}
+    for key, location in locations.items():
+        if not location.is_expired(now):
+            coordinates[key] = location.coordinates
+            geocode_cache.set(key, location.coordinates, get_ttl(location, now))
+
+    unavailable_keys = set()
+    missing_keys = [key for key in queries if key not in coordinates]
+    if missing_keys:
+        client = get_geocoder_client()
+        workers = min(settings.GEOCODER_MAX_WORKERS, len(missing_keys))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(
+                lambda key: fetch_coordinates(client, queries[key]),
+                missing_keys,
+            )
+
+        new_locations = []
+        expired_locations = []
+        for key, (answered, found) in zip(missing_keys, results):
+            if not answered:
+                coordinates[key] = None
+                unavailable_keys.add(key)
+                continue
+            lon, lat = found or (None, None)
+            location = locations.get(key) or Location(address=key)
+            location.lat, location.lon, location.query_date = lat, lon, now
+            coordinates[key] = location.coordinates
+            geocode_cache.set(key, location.coordinates, get_ttl(location, now))
+            if location.pk:
+                expired_locations.append(location)
+            else:
+                new_locations.append(location)
+        Location.objects.bulk_create(new_locations, ignore_conflicts=True)
+        Location.objects.bulk_update(expired_locations, ['lat', 'lon', 'query_date'])
+
+    return (
+        {address: coordinates[normalize_address(address)] for address in addresses},
+        {address for address in addresses if normalize_address(address) in unavailable_keys},
+    )
+
+
+def get_coordinates(addresses):
+    coordinates, _ = geocode_addresses(addresses)
+    return coordinates
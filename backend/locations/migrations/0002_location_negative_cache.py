@@ -0,0 +1,51 @@
+# Generated by Django 3.2.15 on 2026-10-18 18:47
+
+import re
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+def normalize_addresses(apps, schema_editor):
+    Location = apps.get_model('locations', 'Location')
+    latest_locations = {}
+    duplicate_ids = []
+    for location in Location.objects.order_by('-query_date').iterator():
+        address = location.address.lower().replace('ё', 'е')
+        address = ' '.join(re.sub(r'[^\w\s]', ' ', address).split())
+        if address in latest_locations:
+            duplicate_ids.append(location.id)
+        else:
+            latest_locations[address] = location
+    Location.objects.filter(id__in=duplicate_ids).delete()
+
+    for address, location in latest_locations.items():
+        if address != location.address:
+            location.address = address
+            location.save(update_fields=['address'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('locations', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='location',
+            name='lat',
+            field=models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True, verbose_name='широта'),
+        ),
+        migrations.AlterField(
+            model_name='location',
+            name='lon',
+            field=models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True, verbose_name='долгота'),
+        ),
+        migrations.AlterField(
+            model_name='location',
+            name='query_date',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='дата запроса'),
+        ),
+        migrations.RunPython(normalize_addresses, migrations.RunPython.noop),
+    ]
@@ -1,11 +1,32 @@
+from datetime import timedelta
+
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
 
 
 class Location(models.Model):
     address = models.CharField('адрес', max_length=200, unique=True)
-    lat = models.DecimalField('широта', max_digits=9, decimal_places=6)
-    lon = models.DecimalField('долгота', max_digits=9, decimal_places=6)
-    query_date = models.DateTimeField('дата запроса')
+    lat = models.DecimalField('широта', max_digits=9, decimal_places=6, null=True, blank=True)
+    lon = models.DecimalField('долгота', max_digits=9, decimal_places=6, null=True, blank=True)
+    query_date = models.DateTimeField('дата запроса', default=timezone.now, db_index=True)
 
     def __str__(self):
-        return f'{self.address} {self.lat} {self.lon}'
\ No newline at end of file
+        return f'{self.address} {self.lat} {self.lon}'
+
+    @property
+    def coordinates(self):
+        if self.lat is None or self.lon is None:
+            return None
+        return float(self.lat), float(self.lon)
+
+    @property
+    def expires_at(self):
+        if self.coordinates:
+            ttl = settings.GEOCODE_CACHE_TTL
+        else:
+            ttl = settings.GEOCODE_NEGATIVE_CACHE_TTL
+        return self.query_date + timedelta(seconds=ttl)
+
+    def is_expired(self, now=None):
+        return self.expires_at <= (now or timezone.now())
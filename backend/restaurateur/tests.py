@@ -1,3 +1,104 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.template.loader import render_to_string
 from django.test import TestCase
+from django.utils import timezone
+
+from foodcartapp.models import Order, OrderEvent
+
+from .views import get_fragment_versions, get_orders_page, make_orders_cursor, parse_orders_cursor
+
+
+def create_order(**overrides):
+    return Order.objects.create(**{
+        'firstname': 'Иван',
+        'lastname': 'Петров',
+        'phonenumber': '+79001234567',
+        'address': 'Москва',
+        **overrides,
+    })
+
+
+class OrderRowCacheTest(TestCase):
+    def setUp(self):
+        self.order = create_order()
+
+    def render_row(self):
+        order = Order.objects.get(pk=self.order.pk)
+        return render_to_string('order_row.html', {'item': order, **get_fragment_versions()})
+
+    def test_row_is_rerendered_after_events_are_purged(self):
+        OrderEvent.objects.all().delete()
+        self.assertIn('Иван', self.render_row())
+
+        self.order.firstname = 'Пётр'
+        self.order.save()
+        OrderEvent.objects.all().delete()
+
+        self.assertIn('Пётр', self.render_row())
+
+
+@mock.patch('restaurateur.views.ORDERS_PAGE_SIZE', 3)
+class OrdersPaginationTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now().replace(microsecond=123456)
+        cls.orders = [
+            # most orders share created_at, so pages are split by id
+            create_order(created_at=now if number < 6 else now + timedelta(seconds=number))
+            for number in range(8)
+        ]
+        cls.ordered_ids = [
+            order.id for order in sorted(cls.orders, key=lambda order: (order.created_at, order.id))
+        ]
+        cls.manager = User.objects.create_user('manager', password='password', is_staff=True)
+
+    def get_page_ids(self, **kwargs):
+        page, has_previous, has_next = get_orders_page(Order.objects.all(), **kwargs)
+        return [order.id for order in page], has_previous, has_next
+
+    def test_cursor_round_trip(self):
+        order = self.orders[0]
+        self.assertEqual(parse_orders_cursor(make_orders_cursor(order)), (order.created_at, order.id))
+        self.assertIsNone(parse_orders_cursor('broken'))
+
+    def test_pages_forward_and_backward(self):
+        ids, has_previous, has_next = self.get_page_ids()
+        self.assertEqual(ids, self.ordered_ids[:3])
+        self.assertEqual((has_previous, has_next), (False, True))
+
+        ids, has_previous, has_next = self.get_page_ids(after=(self.orders[2].created_at, self.ordered_ids[2]))
+        self.assertEqual(ids, self.ordered_ids[3:6])
+        self.assertEqual((has_previous, has_next), (True, True))
+
+        ids, has_previous, has_next = self.get_page_ids(after=(self.orders[5].created_at, self.ordered_ids[5]))
+        self.assertEqual(ids, self.ordered_ids[6:])
+        self.assertEqual((has_previous, has_next), (True, False))
+
+        ids, has_previous, has_next = self.get_page_ids(before=(self.orders[0].created_at, self.ordered_ids[3]))
+        self.assertEqual(ids, self.ordered_ids[:3])
+        self.assertEqual((has_previous, has_next), (False, True))
+
+        ids, has_previous, has_next = self.get_page_ids(before=(self.orders[6].created_at, self.ordered_ids[6]))
+        self.assertEqual(ids, self.ordered_ids[3:6])
+        self.assertEqual((has_previous, has_next), (True, True))
+
+    def test_cursors_survive_query_string(self):
+        self.client.force_login(self.manager)
+        seen_ids = []
+        params = ''
+        while params is not None:
+            response = self.client.get(f'/manager/orders/?{params}')
+            seen_ids += [order.id for order in response.context['orders']]
+            params = response.context['next_page_params']
+        self.assertEqual(seen_ids, self.ordered_ids)
 
-# Create your tests here.
+        seen_ids = []
+        params = response.context['previous_page_params']
+        while params is not None:
+            response = self.client.get(f'/manager/orders/?{params}')
+            seen_ids = [order.id for order in response.context['orders']] + seen_ids
+            params = response.context['previous_page_params']
+        self.assertEqual(seen_ids, self.ordered_ids[:6])
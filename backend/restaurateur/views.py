@@ -1,25 +1,43 @@
+import json
+import os
 from datetime import datetime
 
 from django import forms
+from django.contrib import messages
+from django.http import HttpResponse, JsonResponse
 from django.shortcuts import redirect, render
+from django.template.loader import render_to_string
 from django.views import View
 from django.urls import reverse_lazy
-from django.conf import settings
 from django.contrib.auth.decorators import user_passes_test
 from django.contrib.auth import authenticate, login
 from django.contrib.auth import views as auth_views
-from geopy import distance
-from urllib.error import HTTPError
-import requests
-
-
-from foodcartapp.models import Product, Restaurant, Order, RestaurantMenuItem
-from locations.models import Location
-
-
-class GeopositionError(TypeError):
-    def __init__(self, text):
-        self.txt = text
+from django.db.models import F, Prefetch, Q, prefetch_related_objects
+
+
+from foodcartapp.catalogue import (
+    MENU_VERSION,
+    PRODUCTS_VERSION,
+    RESTAURANTS_VERSION,
+    get_availability_matrix,
+    set_menu_availability,
+)
+from foodcartapp.models import (
+    Order,
+    OrderCandidate,
+    OrderEvent,
+    OrderStatus,
+    PaymentMethod,
+    Product,
+    Restaurant,
+)
+from locations.cache import geocode_cache
+from star_burger.caching import get_version, get_version_timeout
+
+
+ORDERS_PAGE_SIZE = 50
+ORDERS_EVENTS_BATCH_SIZE = 500
+ORDERS_EVENTS_RETRY = 3000
 
 
 class Login(forms.Form):
@@ -39,6 +57,63 @@ class Login(forms.Form):
     )
 
 
+class OrdersFilter(forms.Form):
+    status = forms.TypedChoiceField(
+        label='Статус',
+        required=False,
+        choices=[('', 'Все необработанные')] + OrderStatus.choices,
+        coerce=int,
+        empty_value=None,
+        widget=forms.Select(attrs={'class': 'form-control'}),
+    )
+    payment_method = forms.TypedChoiceField(
+        label='Способ оплаты',
+        required=False,
+        choices=[('', 'Любой')] + PaymentMethod.choices,
+        coerce=int,
+        empty_value=None,
+        widget=forms.Select(attrs={'class': 'form-control'}),
+    )
+    restaurant = forms.ModelChoiceField(
+        label='Ресторан',
+        required=False,
+        queryset=Restaurant.objects.order_by('name'),
+        empty_label='Любой',
+        widget=forms.Select(attrs={'class': 'form-control'}),
+    )
+
+    def filter_orders(self, orders):
+        status = self.cleaned_data.get('status')
+        if status is not None:
+            orders = orders.filter(status=status)
+        else:
+            orders = orders.exclude(status=OrderStatus.DONE)
+        if self.cleaned_data.get('payment_method') is not None:
+            orders = orders.filter(payment_method=self.cleaned_data['payment_method'])
+        if self.cleaned_data.get('restaurant'):
+            orders = orders.filter(restaurant=self.cleaned_data['restaurant'])
+        return orders
+
+
+class MenuAvailabilityForm(forms.Form):
+    products = forms.ModelMultipleChoiceField(
+        label='Товары',
+        queryset=Product.objects.order_by('name'),
+        widget=forms.SelectMultiple(attrs={'class': 'form-control', 'size': 15}),
+    )
+    restaurants = forms.ModelMultipleChoiceField(
+        label='Рестораны',
+        queryset=Restaurant.objects.order_by('name'),
+        widget=forms.SelectMultiple(attrs={'class': 'form-control', 'size': 15}),
+    )
+    availability = forms.TypedChoiceField(
+        label='Наличие',
+        choices=[(1, 'В продаже'), (0, 'Нет в наличии')],
+        coerce=lambda value: bool(int(value)),
+        widget=forms.Select(attrs={'class': 'form-control'}),
+    )
+
+
 class LoginView(View):
     def get(self, request, *args, **kwargs):
         form = Login()
@@ -70,71 +145,58 @@ class LogoutView(auth_views.LogoutView):
     next_page = reverse_lazy('restaurateur:login')
 
 
-def fetch_coordinates(apikey, address):
-    base_url = "https://geocode-maps.yandex.ru/1.x"
-    response = requests.get(base_url, params={
-        "geocode": address,
-        "apikey": apikey,
-        "format": "json",
-    })
-    response.raise_for_status()
-    found_places = response.json()['response']['GeoObjectCollection']['featureMember']
-
-    if not found_places:
-        raise GeopositionError('Uncorrect address')
-
-    most_relevant = found_places[0]
-    lon, lat = most_relevant['GeoObject']['Point']['pos'].split(" ")
-    return lon, lat
-
-
-def get_coordinates(order_address):
-    try:
-        location = Location.objects.get(address=order_address)
-        lon = location.lon
-        lat = location.lat
-    except Location.DoesNotExist:
-        try:
-            lon, lat = fetch_coordinates(
-                settings.YANDEX_API_KEY,
-                order_address,
-            )
-        except (KeyError, HTTPError):
-            lon, lat = None, None
-
-        Location.objects.get_or_create(
-            query_date=datetime.now(),
-            defaults={
-                'address': order_address,
-                'lon': lon,
-                'lat': lat,
-                }
-            )
-    order_coordinates = (lon, lat)
-    return order_coordinates
-
-
 def is_manager(user):
     return user.is_staff  # FIXME replace with specific permission
 
 
+def get_fragment_versions():
+    return {
+        'fragment_timeout': get_version_timeout(),
+        'menu_version': get_version(MENU_VERSION),
+        'products_version': get_version(PRODUCTS_VERSION),
+        'restaurants_version': get_version(RESTAURANTS_VERSION),
+    }
+
+
 @user_passes_test(is_manager, login_url='restaurateur:login')
 def view_products(request):
-    restaurants = list(Restaurant.objects.order_by('name'))
-    products = list(Product.objects.prefetch_related('menu_items'))
+    product_ids, restaurant_ids, matrix = get_availability_matrix()
+    products = Product.objects.select_related('category').in_bulk(product_ids)
+    restaurants = Restaurant.objects.in_bulk(restaurant_ids)
 
-    products_with_restaurant_availability = []
-    for product in products:
-        availability = {item.restaurant_id: item.availability for item in product.menu_items.all()}
-        ordered_availability = [availability.get(restaurant.id, False) for restaurant in restaurants]
-
-        products_with_restaurant_availability.append(
-            (product, ordered_availability)
-        )
+    products_with_restaurant_availability = [
+        (products[product_id], availability)
+        for product_id, availability in zip(product_ids, matrix.tolist())
+        if product_id in products
+    ]
 
     return render(request, template_name="products_list.html", context={
         'products_with_restaurant_availability': products_with_restaurant_availability,
-        'restaurants': restaurants,
+        'restaurants': [restaurants[restaurant_id] for restaurant_id in restaurant_ids if restaurant_id in restaurants],
+        **get_fragment_versions(),
+    })
+
+
+@user_passes_test(is_manager, login_url='restaurateur:login')
+def view_menu_availability(request):
+    if request.method == 'POST':
+        form = MenuAvailabilityForm(request.POST)
+        if form.is_valid():
+            changed_count = set_menu_availability(
+                [product.id for product in form.cleaned_data['products']],
+                [restaurant.id for restaurant in form.cleaned_data['restaurants']],
+                form.cleaned_data['availability'],
+            )
+            messages.success(request, f'Обновлено пунктов меню: {changed_count}')
+            return redirect('restaurateur:menu_availability')
+    else:
+        form = MenuAvailabilityForm(initial={
+            'products': request.GET.getlist('products'),
+            'restaurants': request.GET.getlist('restaurants'),
+        })
+
+    return render(request, template_name='menu_availability.html', context={
+        'form': form,
     })
 
 
@@ -142,29 +204,140 @@ def view_products(request):
 def view_restaurants(request):
     return render(request, template_name="restaurants_list.html", context={
         'restaurants': Restaurant.objects.all(),
+        **get_fragment_versions(),
     })
 
 
+def make_orders_cursor(order):
+    return f'{order.created_at.isoformat()}_{order.id}'
+
+
+def parse_orders_cursor(cursor):
+    try:
+        created_at, order_id = cursor.rsplit('_', 1)
+        return datetime.fromisoformat(created_at), int(order_id)
+    except (AttributeError, ValueError):
+        return None
+
+
+def get_orders_page(orders, after=None, before=None):
+    if before:
+        created_at, order_id = before
+        orders = orders.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=order_id)
+        ).order_by('-created_at', '-id')
+    else:
+        if after:
+            created_at, order_id = after
+            orders = orders.filter(
+                Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=order_id)
+            )
+        orders = orders.order_by('created_at', 'id')
+
+    page = list(orders[:ORDERS_PAGE_SIZE + 1])
+    has_more = len(page) > ORDERS_PAGE_SIZE
+    page = page[:ORDERS_PAGE_SIZE]
+    if before:
+        page.reverse()
+        return page, has_more, True
+    return page, bool(after), has_more
+
+
+def prefetch_candidates(orders):
+    candidates = (
+        OrderCandidate.objects
+        .select_related('restaurant')
+        .order_by(F('distance').asc(nulls_last=True), 'restaurant__name')
+    )
+    prefetch_related_objects(orders, Prefetch('candidates', queryset=candidates))
+
+
 @user_passes_test(is_manager, login_url='restaurateur:login')
 def view_orders(request):
-    orders = Order.objects.get_order().exclude(status='done')
-    order_restaurants = []
+    orders_filter = OrdersFilter(request.GET)
+    orders_filter.is_valid()
+    orders = orders_filter.filter_orders(Order.objects.all())
+
+    last_event_id = OrderEvent.objects.order_by('-id').values_list('id', flat=True).first() or 0
+    page, has_previous, has_next = get_orders_page(
+        orders.select_related('restaurant'),
+        after=parse_orders_cursor(request.GET.get('after')),
+        before=parse_orders_cursor(request.GET.get('before')),
+    )
+    prefetch_candidates(page)
+
+    previous_page_params = next_page_params = None
+    if page and has_previous:
+        previous_page_params = request.GET.copy()
+        previous_page_params.pop('after', None)
+        previous_page_params['before'] = make_orders_cursor(page[0])
+    if page and has_next:
+        next_page_params = request.GET.copy()
+        next_page_params.pop('before', None)
+        next_page_params['after'] = make_orders_cursor(page[-1])
+
+    return render(request, 'order_items.html', {
+        'orders': page,
+        'orders_count': orders.count(),
+        'orders_filter': orders_filter,
+        'last_event_id': last_event_id,
+        'previous_page_params': previous_page_params and previous_page_params.urlencode(),
+        'next_page_params': next_page_params and next_page_params.urlencode(),
+        **get_fragment_versions(),
+    })
+
+
+def format_server_sent_event(event, data=None, event_id=None):
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'event: {event}')
+    lines.append(f'data: {json.dumps(data, ensure_ascii=False)}')
+    return '\n'.join(lines) + '\n\n'
+
+
+@user_passes_test(is_manager, login_url='restaurateur:login')
+def view_orders_events(request):
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    events = OrderEvent.objects.order_by('-id')
+    if not last_event_id or not last_event_id.isdigit():
+        latest_event_id = events.values_list('id', flat=True).first() or 0
+        body = f'retry: {ORDERS_EVENTS_RETRY}\nid: {latest_event_id}\n\n'
+        return HttpResponse(body, content_type='text/event-stream')
+
+    changes = list(
+        OrderEvent.objects
+        .filter(id__gt=last_event_id)
+        .order_by('id')
+        .values_list('id', 'order_id')[:ORDERS_EVENTS_BATCH_SIZE]
+    )
+    if not changes:
+        return HttpResponse(f'retry: {ORDERS_EVENTS_RETRY}\n\n', content_type='text/event-stream')
+
+    changed_order_ids = {order_id for _, order_id in changes}
+    orders_filter = OrdersFilter(request.GET)
+    orders_filter.is_valid()
+    orders = list(
+        orders_filter.filter_orders(Order.objects.filter(id__in=changed_order_ids))
+        .select_related('restaurant')
+        .order_by('created_at', 'id')
+    )
+    prefetch_candidates(orders)
+
+    fragment_versions = get_fragment_versions()
+    chunks = [f'retry: {ORDERS_EVENTS_RETRY}\n\n']
     for order in orders:
-        products = [item.product.id for item in order.order_items.select_related('product')]
-        restaurants = RestaurantMenuItem.objects.get_restaurants(products)
-        order_coordinates = get_coordinates(order.address)
-        for restaurant in restaurants:
-            restaurant_coordinates = get_coordinates(restaurant['restaurant__address'])
-            restaurant['coordinates'] = restaurant_coordinates
-            try:
-                distance_to_order = distance.distance(
-                    order_coordinates,
-                    restaurant_coordinates
-                ).km
-                restaurant['distance_to_order'] = f'{round(distance_to_order, 2)} км'
-            except ValueError:
-                restaurant['distance_to_order'] = '0 км'
-        order_restaurants.append((order, sorted(restaurants, key=lambda restaurant: restaurant['distance_to_order'])))
-    context = {'order_items': order_restaurants}
-
-    return render(request, 'order_items.html', context)
+        html = render_to_string('order_row.html', {'item': order, **fragment_versions}, request=request)
+        chunks.append(format_server_sent_event('order', {'id': order.id, 'html': html}))
+    for order_id in changed_order_ids - {order.id for order in orders}:
+        chunks.append(format_server_sent_event('order', {'id': order_id, 'html': None}))
+    chunks.append(format_server_sent_event('cursor', event_id=changes[-1][0]))
+    return HttpResponse(''.join(chunks), content_type='text/event-stream')
+
+
+@user_passes_test(is_manager, login_url='restaurateur:login')
+def view_geocode_cache_stats(request):
+    return JsonResponse({
+        'worker_pid': os.getpid(),
+        **geocode_cache.get_stats(),
+    })
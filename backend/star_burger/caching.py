@@ -0,0 +1,63 @@
+import hashlib
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+
+def make_key(name, *parts):
+    return ':'.join([name, *map(str, parts)])
+
+
+def make_hashed_key(name, value):
+    # Arbitrary text such as addresses may be too long or contain characters not allowed in keys
+    return make_key(name, hashlib.sha1(value.encode()).hexdigest())
+
+
+def make_version_key(name):
+    return make_key('version', name)
+
+
+def get_version_timeout():
+    # Versions of a per-worker cache can't be bumped from other workers,
+    # so they are allowed to expire and get renewed instead
+    return settings.CACHE_VERSION_TIMEOUT or None
+
+
+def get_version(name):
+    key = make_version_key(name)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time(), get_version_timeout())
+        version = cache.get(key)
+    return version
+
+
+def bump_version(name):
+    version = time.time()
+    cache.set(make_version_key(name), version, get_version_timeout())
+    return version
+
+
+def bump_version_on_commit(name):
+    # Bumping before commit would let concurrent requests cache old data under the new version
+    transaction.on_commit(lambda: bump_version(name))
+
+
+def get_version_etag(name):
+    return f'"{name}-{get_version(name)}"'
+
+
+def get_version_datetime(name):
+    return datetime.fromtimestamp(get_version(name), tz=timezone.utc)
+
+
+def get_or_build(name, build):
+    key = make_key(name, get_version(name))
+    content = cache.get(key)
+    if content is None:
+        content = build()
+        cache.set(key, content, get_version_timeout())
+    return content
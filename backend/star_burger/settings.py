@@ -6,6 +6,21 @@ env = Env()
 env.read_env()
 
 YANDEX_API_KEY = env('YANDEX_API_KEY')
+GEOCODER_CLIENT = env.str('GEOCODER_CLIENT', 'locations.clients.YandexGeocoderClient')
+GEOCODER_MAX_WORKERS = env.int('GEOCODER_MAX_WORKERS', 5)
+GEOCODER_TIMEOUT = env.float('GEOCODER_TIMEOUT', 3)
+GEOCODER_RETRIES = env.int('GEOCODER_RETRIES', 2)
+GEOCODER_BACKOFF = env.float('GEOCODER_BACKOFF', 0.3)
+GEOCODER_FAILURE_THRESHOLD = env.int('GEOCODER_FAILURE_THRESHOLD', 5)
+GEOCODER_RESET_TIMEOUT = env.float('GEOCODER_RESET_TIMEOUT', 30)
+GEOCODER_FAKE_DELAY = env.float('GEOCODER_FAKE_DELAY', 0)
+GEOCODE_CACHE_TTL = env.int('GEOCODE_CACHE_TTL', 30 * 24 * 60 * 60)
+GEOCODE_NEGATIVE_CACHE_TTL = env.int('GEOCODE_NEGATIVE_CACHE_TTL', 24 * 60 * 60)
+GEOCODE_LOCAL_CACHE_SIZE = env.int('GEOCODE_LOCAL_CACHE_SIZE', 10000)
+GEOCODE_LOCAL_CACHE_TTL = env.int('GEOCODE_LOCAL_CACHE_TTL', 60)
+
+CACHE_VERSION_TIMEOUT = env.int('CACHE_VERSION_TIMEOUT', 60)
+IDEMPOTENCY_KEY_TTL = env.int('IDEMPOTENCY_KEY_TTL', 24 * 60 * 60)
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
@@ -93,7 +108,15 @@ WSGI_APPLICATION = 'star_burger.wsgi.application'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 MEDIA_URL = '/media/'
 
-DATABASES = {'default': env.dj_db_url("DB_URL")}
+DATABASES = {
+    'default': {
+        **env.dj_db_url("DB_URL", conn_max_age=env.int('DB_CONN_MAX_AGE', 60)),
+        'DISABLE_SERVER_SIDE_CURSORS': env.bool('DB_DISABLE_SERVER_SIDE_CURSORS', False),
+    },
+}
+DB_CONN_HEALTH_CHECKS = env.bool('DB_CONN_HEALTH_CHECKS', False)
+
+CACHES = {'default': env.dj_cache_url('CACHE_URL', 'locmem://')}
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -12,3 +12,5 @@ from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "star_burger.settings")
 application = get_wsgi_application()
+
+import star_burger.db  # noqa: E402,F401 connects the connection health check
@@ -11,6 +11,7 @@ npm ci --include=dev
 
 python manage.py collectstatic --noinput
 python manage.py migrate --noinput
+python manage.py copy_banner_images
 
 systemctl restart sb-gunicorn.service
 systemctl reload nginx.service